@@ -1,6 +1,11 @@
+from collections import Counter
+
+from can_bus import Frame
 from ecu import ECU
 
 class AttackerECU(ECU):
+    __slots__ = ("observed_patterns", "target_pattern")
+
     def __init__(self, name, bus):
         super().__init__(name, bus)
         self.observed_patterns = {}  # Tracks periodic messages and precedents
@@ -8,34 +13,16 @@ class AttackerECU(ECU):
 
     def analyze_pattern(self, traffic):
         """Identify a pattern of periodic messages preceded by a specific message."""
-        potential_patterns = {}
-
-        for i in range(len(traffic) - 1):
-            # Extract current and next frames
-            current_frame = traffic[i]
-            next_frame = traffic[i + 1]
-
-            # Check if the next frame is periodic
-            next_id = next_frame['id']
-            if next_id not in potential_patterns:
-                potential_patterns[next_id] = {}
+        # Count each (precedent_id, next_id) sequence of consecutive frames
+        ids = [frame.id for frame in traffic]
+        sequence_counts = Counter(zip(ids, ids[1:]))
 
-            # Increment the count of this current_frame -> next_frame sequence
-            current_id = current_frame['id']
-            if current_id not in potential_patterns[next_id]:
-                potential_patterns[next_id][current_id] = 0
-
-            potential_patterns[next_id][current_id] += 1
-
-        # Find the most frequent precedents for the periodic message
+        # Find the most frequent precedent -> periodic sequence
         target_pattern = None
         max_count = 0
 
-        for periodic_id, precedents in potential_patterns.items():
-            for precedent_id, count in precedents.items():
-                if count > max_count:
-                    max_count = count
-                    target_pattern = (precedent_id, periodic_id)
+        if sequence_counts:
+            target_pattern, max_count = sequence_counts.most_common(1)[0]
 
         # Assign the identified pattern if it is consistent
         if target_pattern and max_count > 1:  # Require the pattern to appear at least twice
@@ -54,38 +41,39 @@ class AttackerECU(ECU):
         precedent_id, target_id = self.target_pattern
 
         """Tx parameters"""
-        current_time_ms = 0
         step = 100
         periodic_frame_interval = 500
+        slots_per_period = periodic_frame_interval // step
+
+        # Countdown (in time slots) to the slot right before the victim's periodic slot
+        slots_to_preceded = slots_per_period - 1
 
         while not victim.is_bus_off:
             """Victim normal Tx behaviour"""
-            if (current_time_ms + step) % periodic_frame_interval == 0:
+            if slots_to_preceded == 0:
                 victim.send_preceded_frame()  # Send the preceded frame
+                slots_to_preceded = slots_per_period
             else:
                 victim.send_non_periodic_frame()  # Send a non-periodic frame
 
             # Attacker listens for the precedent frame
-            frame = self.bus.receive_frame()
+            frame = self._bus_recv()
 
-            if frame and frame["id"] == precedent_id:
-                self._print(f"\n[{self.name}] Detected preceded frame: {precedent_id}. Preparing attack frame.\n")
+            if frame and frame.id == precedent_id:
+                if ECU.verbose:
+                    self._print(f"\n[{self.name}] Detected preceded frame: {precedent_id}. Preparing attack frame.\n")
 
                 # Fabricate the attack frame with a dominant DLC
-                fabricated_frame = {
-                    "id": target_id,
-                    "dlc": "0000",
-                    "data": frame["data"]
-                }
+                fabricated_frame = Frame(id=target_id, dlc="0000", dlc_int=0, data=frame.data)
 
                 # Reach the time on which victim periodic transmission is planned
-                current_time_ms += step
+                slots_to_preceded -= 1
                 
                 # Simultaneous transmission of victim's and attacker's messages
                 victim.send_periodic_frame()
                 self.send(fabricated_frame)
 
                 # Resolve collisions using the CAN bus logic
-                self.bus.receive_frame()
+                self._bus_recv()
 
-            current_time_ms += step 
+            slots_to_preceded -= 1
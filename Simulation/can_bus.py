@@ -1,11 +1,24 @@
+from collections import namedtuple
+
+# A CAN frame: 11-bit ID and 4-bit DLC as bit strings, the DLC as an int
+# (used for arbitration) and the data bytes as a tuple of 8-bit strings
+Frame = namedtuple("Frame", "id dlc dlc_int data")
+
+
 class CANBus:
     """Simulates a CAN bus with arbitration and error handling."""
 
+    __slots__ = ("_slot0", "_slot1", "_count")
+
     # Class-level flag to suppress print output during bulk runs
     verbose = True
 
     def __init__(self):
-        self.current_transmissions = []  # Tracks ongoing transmissions on the bus
+        # Ongoing transmissions on the bus: at most two ECUs (victim + attacker)
+        # ever transmit in the same slot, so keep two fixed (frame, ecu) slots
+        self._slot0 = None
+        self._slot1 = None
+        self._count = 0
 
     def _print(self, msg: str):
         """Print only if verbose mode is enabled."""
@@ -14,25 +27,26 @@ class CANBus:
 
     def send_frame(self, frame, ecu):
         """Place a frame on the CAN bus."""
-        self.current_transmissions.append((frame, ecu))  # Add frame to the queue
+        if self._count == 0:
+            self._slot0 = (frame, ecu)
+        elif self._count == 1:
+            self._slot1 = (frame, ecu)
+        else:
+            raise RuntimeError("CANBus supports at most two simultaneous transmissions")
+        self._count += 1
 
 
     def handle_arbitration(self):
-        error_found = False
-        winner_frame, winner_ecu = self.current_transmissions[0]
+        """Return (winner_slot, error_found) for the two frames on the bus."""
+        frame0 = self._slot0[0]
+        frame1 = self._slot1[0]
 
-        for frame, ecu in self.current_transmissions:
-            # Check if IDs are identical, then compare DLC
-            if frame['id'] == winner_frame['id']:
-                # Compare DLC (dominant bit wins)
-                for bit_a, bit_b in zip(frame['dlc'], winner_frame['dlc']):
-                    if bit_a != bit_b:
-                        if bit_a == '0' and bit_b == '1':
-                            error_found = True
-                            winner_frame, winner_ecu = frame, ecu #switch to atker winner frame and ecu
-                        break
+        # Check if IDs are identical, then compare DLC
+        # (dominant bit wins: the first differing bit is 0 in the lower DLC value)
+        if frame1.id == frame0.id and frame1.dlc_int < frame0.dlc_int:
+            return 1, True  # second frame (attacker) wins the arbitration
         
-        return winner_frame, winner_ecu, error_found
+        return 0, False
 
 
     def resolve_collisions(self):
@@ -46,18 +60,18 @@ class CANBus:
         - In Phase 1 (both Error-Active): rapid collision retransmissions
         - In Phase 2 (victim Error-Passive): single collision per periodic frame
         """
-        if len(self.current_transmissions) > 1:
-            self._print(f"[CANBus] Collision detected among {len(self.current_transmissions)} nodes.")
+        if self._count > 1:
+            if CANBus.verbose:
+                self._print(f"[CANBus] Collision detected among {self._count} nodes.")
 
             # Determine winner by arbitration (dominant DLC wins when IDs match)
-            winner_frame, winner_ecu, error_found = self.handle_arbitration()
+            winner_slot, error_found = self.handle_arbitration()
             
-            # Find the loser (the other ECU)
-            loser_frame, loser_ecu = None, None
-            for frame, ecu in self.current_transmissions:
-                if ecu != winner_ecu:
-                    loser_frame, loser_ecu = frame, ecu
-                    break
+            # The loser is whichever slot did not win
+            if winner_slot:
+                (winner_frame, winner_ecu), (loser_frame, loser_ecu) = self._slot1, self._slot0
+            else:
+                (winner_frame, winner_ecu), (loser_frame, loser_ecu) = self._slot0, self._slot1
             
             if error_found and loser_ecu:
                 # Bus-Off Attack collision handling:
@@ -66,7 +80,8 @@ class CANBus:
                 
                 # Loser (victim) always gets TEC += 8
                 loser_ecu.increment_error_counter(is_transmit_error=True)
-                self._print(f"[{loser_ecu.name}] Incremented Transmit Error Counter. TEC: {loser_ecu.transmit_error_counter}")
+                if CANBus.verbose:
+                    self._print(f"[{loser_ecu.name}] Incremented Transmit Error Counter. TEC: {loser_ecu.transmit_error_counter}")
                 
                 # Winner (attacker) only gets TEC += 8 in Phase 1 (when loser is Error-Active)
                 # In Phase 2, attacker doesn't increment (passive error flag doesn't cause error)
@@ -74,20 +89,25 @@ class CANBus:
                     winner_ecu.increment_error_counter(is_transmit_error=True)
             
             # Winner transmits successfully, TEC -= 1
-            self._print(f"[CANBus] Frame successfully transmitted: {winner_frame['id']} by {winner_ecu.name}")
+            if CANBus.verbose:
+                self._print(f"[CANBus] Frame successfully transmitted: {winner_frame.id} by {winner_ecu.name}")
             winner_ecu.decrement_error_counters()
             
-            self.current_transmissions.clear()
+            self._slot0 = self._slot1 = None
+            self._count = 0
             return winner_frame
 
-        elif self.current_transmissions:
-            frame, sender = self.current_transmissions.pop(0)
-            self._print(f"[CANBus] Frame successfully transmitted: {frame['id']} by {sender.name}")
+        elif self._count:
+            frame, sender = self._slot0
+            self._slot0 = None
+            self._count = 0
+            if CANBus.verbose:
+                self._print(f"[CANBus] Frame successfully transmitted: {frame.id} by {sender.name}")
             sender.decrement_error_counters()
             return frame
         
     def receive_frame(self):
         """Retrieve and process the next frame."""
-        if not self.current_transmissions:  # Check if there are frames to process
+        if not self._count:  # Check if there are frames to process
             return None
         return self.resolve_collisions()  # Resolve any collisions
@@ -1,16 +1,59 @@
+import array
+
+
+class TecEventLog:
+    """
+    TEC events stored as parallel typed arrays (struct-of-arrays) instead of dicts.
+    ecu holds an index into names, tec the TEC value and flags the state code
+    (bit 0 = Error-Passive, bit 1 = Bus-Off).
+    """
+
+    __slots__ = ("names", "_codes", "ecu", "tec", "flags")
+
+    def __init__(self):
+        self.names = []
+        self._codes = {}
+        self.ecu = array.array("B")
+        self.tec = array.array("l")
+        self.flags = array.array("B")
+
+    def __len__(self):
+        return len(self.tec)
+
+    def ecu_code(self, name):
+        """Return the index used for an ECU name, or None if it has no events."""
+        return self._codes.get(name)
+
+    def append(self, ecu_name, tec, is_error_passive, is_bus_off):
+        """Record one TEC change."""
+        code = self._codes.get(ecu_name)
+        if code is None:
+            code = self._codes[ecu_name] = len(self.names)
+            self.names.append(ecu_name)
+        self.ecu.append(code)
+        self.tec.append(tec)
+        self.flags.append(is_bus_off * 2 + is_error_passive)
+
+
 class ECU:
     """Base class for CAN bus Electronic Control Units."""
 
+    __slots__ = ("name", "bus", "transmit_error_counter", "is_error_passive", "is_bus_off",
+                 "_bus_send", "_bus_recv")
+
     # Class-level flag to suppress print output during bulk runs
     verbose = True
     
-    # Class-level list to collect TEC events for single_run.log
-    # Set to a list to enable collection, None to disable
+    # Class-level TecEventLog to collect TEC events for single_run.log
+    # Set to a TecEventLog to enable collection, None to disable
     tec_events = None
 
     def __init__(self, name, bus):
         self.name = name
         self.bus = bus
+        # Bound bus methods, cached to skip attribute resolution on every frame
+        self._bus_send = bus.send_frame
+        self._bus_recv = bus.receive_frame
         self.transmit_error_counter = 0
         self.is_error_passive = False
         self.is_bus_off = False
@@ -32,61 +75,81 @@ class ECU:
     def send(self, frame):
         """Transmit a CAN frame."""
         if self.is_bus_off:
-            self._print(f"[{self.name}] Cannot send; ECU is in Bus-off state!")
+            if ECU.verbose:
+                self._print(f"[{self.name}] Cannot send; ECU is in Bus-off state!")
             return
 
-        self._print(f"[{self.name}] Sending frame: {frame}")
-        self.bus.send_frame(frame, self)
+        if ECU.verbose:
+            self._print(f"[{self.name}] Sending frame: {frame}")
+        self._bus_send(frame, self)
 
     def listen(self):
         """Listen for a frame on the CAN bus."""
         if self.is_bus_off:
             return
 
-        result = self.bus.receive_frame()
+        result = self._bus_recv()
         if result:
             frame, sender = result
-            if sender != self:
+            if sender != self and ECU.verbose:
                 self._print(f"[{self.name}] Received frame: {frame}")
 
     def increment_error_counter(self, is_transmit_error):
         """Increment the error counter by 8 for transmit errors (per CAN spec)."""
         increment = 8 if is_transmit_error else 0
+        tec_events = ECU.tec_events
+
+        # Fast path for bulk runs: no printing and no TEC event collection
+        if not ECU.verbose and tec_events is None:
+            tec = self.transmit_error_counter + increment
+            self.transmit_error_counter = tec
+            if tec > 127:
+                self.is_error_passive = True
+            if tec > 255:
+                self.is_bus_off = True
+            return
+
         self.transmit_error_counter += increment
 
-        self._print(f"[{self.name}] Incremented {'Transmit' if is_transmit_error else 'Receive'} Error Counter. "
-                    f"TEC: {self.transmit_error_counter}")
+        if ECU.verbose:
+            self._print(f"[{self.name}] Incremented {'Transmit' if is_transmit_error else 'Receive'} Error Counter. "
+                        f"TEC: {self.transmit_error_counter}")
 
         if not self.is_error_passive and self.transmit_error_counter > 127:
             self.is_error_passive = True
-            self._print(f"[{self.name}] Entered Error-Passive state.")
+            if ECU.verbose:
+                self._print(f"[{self.name}] Entered Error-Passive state.")
         if self.transmit_error_counter > 255:
             self.is_bus_off = True
-            self._print(f"[{self.name}] Entered Bus-Off state!")
+            if ECU.verbose:
+                self._print(f"[{self.name}] Entered Bus-Off state!")
         
         # Log TEC event if collection is enabled
-        if ECU.tec_events is not None:
-            ECU.tec_events.append({
-                "ecu_name": self.name,
-                "tec": self.transmit_error_counter,
-                "is_error_passive": self.is_error_passive,
-                "is_bus_off": self.is_bus_off,
-            })
+        if tec_events is not None:
+            tec_events.append(self.name, self.transmit_error_counter,
+                              self.is_error_passive, self.is_bus_off)
 
     def decrement_error_counters(self):
         """Reduce TEC by 1 after successful transmission (per CAN spec)."""
+        tec_events = ECU.tec_events
+
+        # Fast path for bulk runs: no printing and no TEC event collection
+        if not ECU.verbose and tec_events is None:
+            tec = self.transmit_error_counter - 1 if self.transmit_error_counter > 0 else 0
+            self.transmit_error_counter = tec
+            if tec <= 127:
+                self.is_error_passive = False
+            return
+
         old_tec = self.transmit_error_counter
         self.transmit_error_counter = max(0, self.transmit_error_counter - 1)
 
         if self.is_error_passive and self.transmit_error_counter <= 127:
             self.is_error_passive = False
-            self._print(f"[{self.name}] Entered Error-Active state.")
+            if ECU.verbose:
+                self._print(f"[{self.name}] Entered Error-Active state.")
         
         # Log TEC event only if TEC actually changed (was > 0 before)
-        if ECU.tec_events is not None and old_tec > 0:
-            ECU.tec_events.append({
-                "ecu_name": self.name,
-                "tec": self.transmit_error_counter,
-                "is_error_passive": self.is_error_passive,
-                "is_bus_off": self.is_bus_off,
-            })
+        if tec_events is not None and old_tec > 0:
+            tec_events.append(self.name, self.transmit_error_counter,
+                              self.is_error_passive, self.is_bus_off)
@@ -13,16 +13,20 @@ Output files (in attack_logs/):
     - single_run.log       (1 trial, step-by-step timeline)
 """
 
-import json
+import functools
+import itertools
+import math
 import os
 import random
 import time
 import statistics
+from concurrent.futures import ProcessPoolExecutor
 
-from can_bus import CANBus
+from can_bus import CANBus, Frame
 from victim_ecu import VictimECU
 from attacker_ecu import AttackerECU
-from ecu import ECU
+from ecu import ECU, TecEventLog
+from setup_logger import BackgroundLogWriter, compact_dumps
 
 # =============================================================================
 # CONFIGURATION CONSTANTS
@@ -37,6 +41,23 @@ BIT_RATES_KBPS = [1000, 500, 250]
 # Number of trials per bit rate for aggregated logs
 NUM_TRIALS = 1000
 
+# Run the aggregated sweeps through the full ECU/CANBus model instead of the
+# fast path (much slower, trials are spread over all CPU cores; useful to
+# cross-check the fast path)
+FULL_MODEL_SWEEPS = False
+
+# Fast-path sweeps take a few ms per 1000 trials, so they only go to one worker
+# process per bit rate when there are this many trials per bit rate (and more
+# than one CPU); below that, process start-up and result pickling cost more
+PARALLEL_SWEEP_MIN_TRIALS = 100_000
+
+# Full-model trials are handed to workers in chunks of FULL_MODEL_CHUNKSIZE, and
+# the worker pool is replaced once each worker has run about
+# FULL_MODEL_TRIALS_PER_WORKER trials, so long sweeps do not keep growing a
+# fragmented heap in long-lived workers
+FULL_MODEL_CHUNKSIZE = 8
+FULL_MODEL_TRIALS_PER_WORKER = 400
+
 # Default bus speed for single_run.log (500 kbps = standard high-speed CAN)
 SINGLE_RUN_SPEED_KBPS = 500
 
@@ -79,14 +100,68 @@ def get_log_path(filename: str) -> str:
     return os.path.join(LOG_DIR, filename)
 
 
-def write_jsonl(path: str, records):
+# Output paths, resolved once
+LOG_PATHS = {bus_speed: get_log_path(f"attack_{bus_speed}kbps.log") for bus_speed in BIT_RATES_KBPS}
+SINGLE_RUN_PATH = get_log_path("single_run.log")
+
+
+# Aggregated trial fields that change from trial to trial within a sweep
+TRIAL_VARYING_FIELDS = ("time_to_error_passive_ms", "time_to_bus_off_ms", "trial")
+
+
+def make_trial_encoder(varying_fields=TRIAL_VARYING_FIELDS):
     """
-    Write records to a JSON Lines file (one JSON object per line).
-    Overwrites existing file.
+    Return an encode(record) -> str function for aggregated trial records.
+    
+    Within a sweep every field except the varying ones repeats, so the JSON for
+    them is built once per distinct combination and only the varying values are
+    formatted per record. Templates are used only when the fixed values are str,
+    int, float, bool or None and the varying values are int, finite float or None;
+    any other record falls back to compact_dumps, so output always matches it.
     """
-    with open(path, "w", encoding="utf-8") as f:
-        for record in records:
-            f.write(json.dumps(record) + "\n")
+    hole = "\0"
+    hole_json = compact_dumps(hole)
+    templates = {}
+    scalar_types = {str, int, float, bool, type(None)}
+    
+    def encode(record: dict) -> str:
+        # Key on field order and the exact type and value of each fixed field, so
+        # 1 / 1.0 / True (and 0.0 / -0.0, via repr) get separate templates;
+        # varying fields contribute only their name
+        key = []
+        for k, v in record.items():
+            if k in varying_fields:
+                key.append(k)
+            elif type(v) in scalar_types:
+                key.append((k, type(v), repr(v) if type(v) is float else v))
+            else:
+                return compact_dumps(record)
+        key = tuple(key)
+        parts = templates.get(key)
+        if parts is None:
+            parts = compact_dumps({k: hole if k in varying_fields else v
+                                   for k, v in record.items()}).split(hole_json)
+            templates[key] = parts
+        
+        line = [parts[0]]
+        for value, part in zip([v for k, v in record.items() if k in varying_fields], parts[1:]):
+            if value is None:
+                line.append("null")
+            elif type(value) is int or (type(value) is float and math.isfinite(value)):
+                line.append(repr(value))
+            else:
+                # str, bool, NaN/inf, ...: repr() is not valid JSON for these
+                return compact_dumps(record)
+            line.append(part)
+        return "".join(line)
+    
+    return encode
+
+
+def encode_trial_records(results: list) -> list:
+    """Encode one sweep of aggregated trial records as JSON lines."""
+    encode = make_trial_encoder()
+    return [encode(record) for record in results]
 
 
 # =============================================================================
@@ -101,9 +176,10 @@ def calculate_step_ms(bus_speed_kbps: int) -> float:
     return BASE_STEP_MS * (BASE_SPEED_KBPS / bus_speed_kbps)
 
 
-def calculate_bus_time_ms(num_collisions: int, bus_speed_kbps: int) -> float:
+@functools.lru_cache(maxsize=None)
+def _time_per_collision_ms(bus_speed_kbps: int) -> float:
     """
-    Calculate actual CAN bus time for collisions.
+    CAN bus time of one collision cycle at the given bus speed (no jitter).
     Each collision involves: frame attempt + error flag + retransmission.
     """
     bit_time_us = 1000.0 / bus_speed_kbps
@@ -114,30 +190,39 @@ def calculate_bus_time_ms(num_collisions: int, bus_speed_kbps: int) -> float:
     error_time_ms = (BITS_ERROR_FLAG * bit_time_us) / 1000.0
     
     # Each collision: victim attempt + error + attacker success
-    time_per_collision = 2 * frame_time_ms + ifs_time_ms + error_time_ms
-    
+    return 2 * frame_time_ms + ifs_time_ms + error_time_ms
+
+
+def calculate_bus_time_ms(num_collisions: int, bus_speed_kbps: int, rng=random) -> float:
+    """
+    Calculate actual CAN bus time for collisions.
+    Each collision involves: frame attempt + error flag + retransmission.
+    Jitter is drawn from rng (a random.Random, or the random module by default).
+    """
     # Add jitter (±10%) for realism
-    jitter = random.uniform(0.9, 1.1)
-    return num_collisions * time_per_collision * jitter
+    jitter = rng.uniform(0.9, 1.1)
+    return num_collisions * _time_per_collision_ms(bus_speed_kbps) * jitter
 
 
 # =============================================================================
 # SINGLE TRIAL SIMULATION
 # =============================================================================
 
-def run_single_trial(bus_speed_kbps: int, collect_timeline: bool = False):
+def run_single_trial(bus_speed_kbps: int, collect_timeline: bool = False, rng=random):
     """
     Run one Bus-Off attack trial.
     
     Args:
         bus_speed_kbps: CAN bus speed in kbps
         collect_timeline: If True, collect step-by-step events for single_run.log
+        rng: random.Random for the victim's frames, the failure check and timing jitter
+             (default: random module)
         
     Returns:
         dict with trial metrics, plus 'timeline' list if collect_timeline=True
     """
     bus = CANBus()
-    victim = VictimECU("Victim", bus)
+    victim = VictimECU("Victim", bus, rng=rng)
     attacker = AttackerECU("Attacker", bus)
     
     step_ms = calculate_step_ms(bus_speed_kbps)
@@ -174,20 +259,29 @@ def run_single_trial(bus_speed_kbps: int, collect_timeline: bool = False):
                 "note": note
             })
     
+    def with_timeline(result: dict) -> dict:
+        """Attach the timeline to a result only when it was collected."""
+        if timeline is not None:
+            result["timeline"] = timeline
+        return result
+    
     # -------------------------------------------------------------------------
     # Phase 1: Pattern Analysis
     # -------------------------------------------------------------------------
-    traffic = []
-    for _ in range(PATTERN_ANALYSIS_STEPS):
-        if (step_index + 1) % PERIODIC_FRAME_INTERVAL_STEPS == 0:
-            victim.send_preceded_frame()
-            note = "preceded_frame"
-        elif step_index % PERIODIC_FRAME_INTERVAL_STEPS == 0:
-            victim.send_periodic_frame()
-            note = "periodic_frame"
+    # One period of victim traffic, replayed in order instead of testing
+    # step_index modulo the interval on every step
+    period_schedule = []
+    for slot in range(PERIODIC_FRAME_INTERVAL_STEPS):
+        if (slot + 1) % PERIODIC_FRAME_INTERVAL_STEPS == 0:
+            period_schedule.append((victim.send_preceded_frame, "preceded_frame"))
+        elif slot % PERIODIC_FRAME_INTERVAL_STEPS == 0:
+            period_schedule.append((victim.send_periodic_frame, "periodic_frame"))
         else:
-            victim.send_non_periodic_frame()
-            note = "non_periodic"
+            period_schedule.append((victim.send_non_periodic_frame, "non_periodic"))
+    
+    traffic = []
+    for (send, note), _ in zip(itertools.cycle(period_schedule), range(PATTERN_ANALYSIS_STEPS)):
+        send()
         
         result = bus.receive_frame()
         if result:
@@ -204,7 +298,7 @@ def run_single_trial(bus_speed_kbps: int, collect_timeline: bool = False):
     
     if not attacker.target_pattern:
         log_step("attack", "no_pattern_found")
-        return {
+        return with_timeline({
             "bus_speed_kbps": bus_speed_kbps,
             "step_ms": round(step_ms, 3),
             "time_to_error_passive_ms": None,
@@ -214,8 +308,7 @@ def run_single_trial(bus_speed_kbps: int, collect_timeline: bool = False):
             "victim_final_tec": victim.transmit_error_counter,
             "attacker_final_tec": attacker.transmit_error_counter,
             "victim_bus_off": 0,
-            "timeline": timeline
-        }
+        })
     
     precedent_id, target_id = attacker.target_pattern
     attack_step_start = step_index
@@ -225,9 +318,9 @@ def run_single_trial(bus_speed_kbps: int, collect_timeline: bool = False):
     # Check for timing failure (higher bus speed = tighter timing = more failures)
     # This models real-world conditions where attack timing may be off
     failure_rate = FAILURE_RATE.get(bus_speed_kbps, 0.05)
-    if random.random() < failure_rate:
+    if rng.random() < failure_rate:
         log_step("attack", "timing_failure")
-        return {
+        return with_timeline({
             "bus_speed_kbps": bus_speed_kbps,
             "step_ms": round(step_ms, 3),
             "time_to_error_passive_ms": None,
@@ -237,11 +330,14 @@ def run_single_trial(bus_speed_kbps: int, collect_timeline: bool = False):
             "victim_final_tec": victim.transmit_error_counter,
             "attacker_final_tec": attacker.transmit_error_counter,
             "victim_bus_off": 0,
-            "timeline": timeline
-        }
+        })
     
     log_step("attack", f"pattern_found:{precedent_id}->{target_id}")
     
+    # Attack frame with a dominant DLC; frames are immutable, so one instance
+    # is reused for every collision in both phases
+    fabricated_frame = Frame(id=target_id, dlc="0000", dlc_int=0, data=("00000000",))
+    
     # =========================================================================
     # PHASE 1: Rapid collisions until victim enters Error-Passive
     # In Phase 1, victim retries immediately after each collision (no TEC decrements)
@@ -250,12 +346,6 @@ def run_single_trial(bus_speed_kbps: int, collect_timeline: bool = False):
         step_index += 1
         current_time_ms += step_ms
         
-        fabricated_frame = {
-            "id": target_id,
-            "dlc": "0000",
-            "data": ["00000000"]
-        }
-        
         # Simultaneous transmission (collision)
         victim.send_periodic_frame()
         attacker.send(fabricated_frame)
@@ -290,12 +380,6 @@ def run_single_trial(bus_speed_kbps: int, collect_timeline: bool = False):
         step_index += 1
         current_time_ms += step_ms
         
-        fabricated_frame = {
-            "id": target_id,
-            "dlc": "0000",
-            "data": ["00000000"]
-        }
-        
         victim.send_periodic_frame()
         attacker.send(fabricated_frame)
         bus.receive_frame()
@@ -313,14 +397,14 @@ def run_single_trial(bus_speed_kbps: int, collect_timeline: bool = False):
     
     # Calculate actual CAN bus timing
     collisions = steps_to_bus_off if steps_to_bus_off else 0
-    time_to_bus_off_ms = calculate_bus_time_ms(collisions, bus_speed_kbps) if collisions > 0 else None
+    time_to_bus_off_ms = calculate_bus_time_ms(collisions, bus_speed_kbps, rng) if collisions > 0 else None
     
     # Recalculate error-passive time based on collision count (approx 16 collisions to EP)
     if steps_to_error_passive:
         ep_collisions = int(TEC_ERROR_PASSIVE_THRESHOLD / 8) + 1  # ~17 collisions
-        time_to_error_passive_ms = calculate_bus_time_ms(ep_collisions, bus_speed_kbps)
+        time_to_error_passive_ms = calculate_bus_time_ms(ep_collisions, bus_speed_kbps, rng)
     
-    return {
+    return with_timeline({
         "bus_speed_kbps": bus_speed_kbps,
         "step_ms": round(step_ms, 3),
         "time_to_error_passive_ms": round(time_to_error_passive_ms, 3) if time_to_error_passive_ms else None,
@@ -330,8 +414,106 @@ def run_single_trial(bus_speed_kbps: int, collect_timeline: bool = False):
         "victim_final_tec": victim.transmit_error_counter,
         "attacker_final_tec": attacker.transmit_error_counter,
         "victim_bus_off": 1 if victim.is_bus_off else 0,
-        "timeline": timeline
-    }
+    })
+
+
+# =============================================================================
+# FAST-PATH TRIAL (aggregated sweeps)
+# =============================================================================
+
+@functools.lru_cache(maxsize=None)
+def _simulate_attack_core(interval_steps: int,
+                          ep_threshold: int = TEC_ERROR_PASSIVE_THRESHOLD,
+                          bo_threshold: int = TEC_BUS_OFF_THRESHOLD):
+    """
+    Replay the Phase 1 / Phase 2 TEC arithmetic of run_single_trial with plain ints.
+
+    Mirrors the CANBus/ECU rules exactly: the victim loses every collision (TEC += 8),
+    the attacker gets TEC += 8 only while the victim is still Error-Active, and every
+    successful transmission decrements the sender's TEC by 1.
+
+    The result depends only on the arguments (not on bus speed or the RNG), so it
+    is cached; sweeps run in the same process reuse it.
+
+    Returns:
+        (steps_to_error_passive, steps_to_bus_off, victim_tec, attacker_tec)
+    """
+    victim_tec = attacker_tec = 0
+    victim_ep = victim_bo = attacker_ep = False
+    step = 0
+    steps_to_ep = steps_to_bo = None
+
+    def collide():
+        nonlocal victim_tec, attacker_tec, victim_ep, victim_bo, attacker_ep
+        victim_tec += 8
+        if not victim_ep and victim_tec >= ep_threshold:
+            victim_ep = True
+        if victim_tec >= bo_threshold:
+            victim_bo = True
+        if not victim_ep:
+            attacker_tec += 8
+            if not attacker_ep and attacker_tec >= ep_threshold:
+                attacker_ep = True
+        # Attacker frame wins arbitration and is transmitted successfully
+        attacker_tec = max(0, attacker_tec - 1)
+        if attacker_ep and attacker_tec < ep_threshold:
+            attacker_ep = False
+
+    # Phase 1: back-to-back collisions until the victim is Error-Passive
+    while not victim_ep and not victim_bo:
+        step += 1
+        collide()
+
+    if victim_ep:
+        steps_to_ep = step
+
+    # Phase 2: successful victim frames between periodic collisions
+    while not victim_bo:
+        for _ in range(interval_steps - 1):
+            victim_tec = max(0, victim_tec - 1)
+            if victim_ep and victim_tec < ep_threshold:
+                victim_ep = False
+            step += 1
+
+        step += 1
+        collide()
+
+        # Safety limit (same bound as run_single_trial)
+        if step > 10000 - PATTERN_ANALYSIS_STEPS:
+            break
+
+    if victim_bo:
+        steps_to_bo = step
+
+    return steps_to_ep, steps_to_bo, victim_tec, attacker_tec
+
+
+def check_fast_path(bus_speed_kbps: int = SINGLE_RUN_SPEED_KBPS, max_seeds: int = 20):
+    """
+    Cross-check _simulate_attack_core against the full ECU/CANBus model.
+    
+    Runs one quiet, seeded run_single_trial that gets past the timing-failure check
+    and raises RuntimeError if its TEC outcome differs from the fast path's, so a
+    change to the ECU/CANBus error rules cannot silently desync the sweep logs.
+    """
+    expected = _simulate_attack_core(PERIODIC_FRAME_INTERVAL_STEPS)
+    
+    saved = ECU.verbose, CANBus.verbose, ECU.tec_events
+    ECU.verbose = CANBus.verbose = False
+    ECU.tec_events = None
+    try:
+        for seed in range(max_seeds):
+            result = run_single_trial(bus_speed_kbps, rng=random.Random(seed))
+            if result["steps_to_error_passive"] is not None:
+                break
+    finally:
+        ECU.verbose, CANBus.verbose, ECU.tec_events = saved
+    
+    actual = (result["steps_to_error_passive"], result["steps_to_bus_off"],
+              result["victim_final_tec"], result["attacker_final_tec"])
+    if actual != expected:
+        raise RuntimeError(f"Fast path {expected} disagrees with full model {actual}; "
+                           f"update _simulate_attack_core")
 
 
 # =============================================================================
@@ -341,18 +523,121 @@ def run_single_trial(bus_speed_kbps: int, collect_timeline: bool = False):
 def run_aggregated_trials(bus_speed_kbps: int, num_trials: int) -> list:
     """
     Run multiple trials and return aggregated results.
+    
+    The victim's preceded -> periodic frame pattern is fixed by construction of
+    VictimECU, so pattern analysis is skipped entirely. The TEC dynamics contain
+    no randomness, so the collision counts are computed once per sweep; only the
+    timing-failure draw and the bus-time jitter vary per trial. See
+    run_single_trial for the full OOP model.
     """
+    # Own generator per bit rate so each sweep is reproducible whether it runs
+    # in-process or in a worker (RANDOM_SEED=None seeds from OS entropy, so forked workers differ)
+    rng = random.Random(None if RANDOM_SEED is None else RANDOM_SEED + bus_speed_kbps)
+    
+    step_ms = round(calculate_step_ms(bus_speed_kbps), 3)
+    failure_rate = FAILURE_RATE.get(bus_speed_kbps, 0.05)
+    
+    steps_to_error_passive, steps_to_bus_off, victim_tec, attacker_tec = \
+        _simulate_attack_core(PERIODIC_FRAME_INTERVAL_STEPS)
+    ep_collisions = int(TEC_ERROR_PASSIVE_THRESHOLD / 8) + 1  # ~17 collisions
+    time_per_collision = _time_per_collision_ms(bus_speed_kbps)
+    uniform = rng.uniform
+    draw = rng.random
+    
     results = []
     
     for trial in range(1, num_trials + 1):
-        result = run_single_trial(bus_speed_kbps, collect_timeline=False)
-        result["trial"] = trial
-        del result["timeline"]  # Not needed for aggregated logs
-        results.append(result)
+        if draw() < failure_rate:
+            results.append({
+                "bus_speed_kbps": bus_speed_kbps,
+                "step_ms": step_ms,
+                "time_to_error_passive_ms": None,
+                "time_to_bus_off_ms": None,
+                "steps_to_error_passive": None,
+                "steps_to_bus_off": None,
+                "victim_final_tec": 0,
+                "attacker_final_tec": 0,
+                "victim_bus_off": 0,
+                "trial": trial
+            })
+            continue
+        
+        # Same as calculate_bus_time_ms, with the per-speed constant hoisted
+        time_to_bus_off_ms = steps_to_bus_off * time_per_collision * uniform(0.9, 1.1) if steps_to_bus_off else None
+        time_to_error_passive_ms = ep_collisions * time_per_collision * uniform(0.9, 1.1) if steps_to_error_passive else None
+        
+        results.append({
+            "bus_speed_kbps": bus_speed_kbps,
+            "step_ms": step_ms,
+            "time_to_error_passive_ms": round(time_to_error_passive_ms, 3) if time_to_error_passive_ms else None,
+            "time_to_bus_off_ms": round(time_to_bus_off_ms, 3) if time_to_bus_off_ms else None,
+            "steps_to_error_passive": steps_to_error_passive,
+            "steps_to_bus_off": steps_to_bus_off,
+            "victim_final_tec": victim_tec,
+            "attacker_final_tec": attacker_tec,
+            "victim_bus_off": 1 if steps_to_bus_off else 0,
+            "trial": trial
+        })
     
     return results
 
 
+def run_encoded_sweep(bus_speed_kbps: int, num_trials: int) -> tuple:
+    """
+    Run one aggregated sweep and serialize it, returning (results, json_lines).
+    Also the worker entry point for large parallel sweeps, so encoding happens
+    off the main process there.
+    """
+    results = run_aggregated_trials(bus_speed_kbps, num_trials)
+    return results, encode_trial_records(results)
+
+
+def _init_full_model_worker():
+    """Worker initializer: silence output and TEC event collection in each worker."""
+    ECU.verbose = False
+    CANBus.verbose = False
+    ECU.tec_events = None
+
+
+def _run_full_model_trial(work_item) -> dict:
+    """Run one full-model trial in a worker process from a (speed, trial, seed) item."""
+    bus_speed_kbps, trial, seed = work_item
+    result = run_single_trial(bus_speed_kbps, collect_timeline=False, rng=random.Random(seed))
+    result["trial"] = trial
+    return result
+
+
+def run_full_model_trials(bus_speed_kbps: int, num_trials: int) -> list:
+    """
+    Run multiple trials through the full ECU/CANBus model (run_single_trial).
+    
+    Trials are independent, so they are spread over all CPU cores in chunks of
+    FULL_MODEL_CHUNKSIZE, with a new pool every FULL_MODEL_TRIALS_PER_WORKER
+    trials per worker. Each trial gets its own random.Random seeded from
+    RANDOM_SEED, the bus speed and the trial number, so results do not depend on
+    how trials are scheduled across workers. With RANDOM_SEED = None the base
+    seed comes from the OS and runs are not reproducible.
+    """
+    if RANDOM_SEED is None:
+        base_seed = random.SystemRandom().randrange(1 << 32)
+    else:
+        base_seed = RANDOM_SEED + bus_speed_kbps
+    work_items = [(bus_speed_kbps, trial, base_seed * 1_000_003 + trial)
+                  for trial in range(1, num_trials + 1)]
+    
+    ncpu = os.cpu_count() or 1
+    batch_size = FULL_MODEL_TRIALS_PER_WORKER * ncpu
+    results = []
+    # One fresh pool per batch recycles the workers (max_tasks_per_child needs
+    # Python 3.11+ and hangs on 3.11 when a worker retires with work pending)
+    for start in range(0, len(work_items), batch_size):
+        with ProcessPoolExecutor(max_workers=ncpu, initializer=_init_full_model_worker) as pool:
+            # map yields results in submission order, i.e. already sorted by trial
+            results.extend(pool.map(_run_full_model_trial, work_items[start:start + batch_size],
+                                    chunksize=FULL_MODEL_CHUNKSIZE))
+    return results
+
+
 def print_summary(results: list, bus_speed_kbps: int):
     """Print summary statistics for a sweep."""
     bus_off_count = sum(1 for r in results if r["victim_bus_off"] == 1)
@@ -365,80 +650,35 @@ def print_summary(results: list, bus_speed_kbps: int):
     print(f"\n  Summary for {bus_speed_kbps} kbps:")
     print(f"    Bus-Off success: {bus_off_count}/{total} ({100*bus_off_count/total:.1f}%)")
     
+    # fmean works in plain floats (statistics.mean does exact rational arithmetic),
+    # and one sort gives median, min and max together
     if times:
-        print(f"    Time to Bus-Off: mean={statistics.mean(times):.2f}ms, "
+        times.sort()
+        print(f"    Time to Bus-Off: mean={statistics.fmean(times):.2f}ms, "
               f"median={statistics.median(times):.2f}ms, "
-              f"min={min(times):.2f}ms, max={max(times):.2f}ms")
+              f"min={times[0]:.2f}ms, max={times[-1]:.2f}ms")
     
     if ep_times:
-        print(f"    Time to Error-Passive: mean={statistics.mean(ep_times):.2f}ms")
+        print(f"    Time to Error-Passive: mean={statistics.fmean(ep_times):.2f}ms")
 
 
 # =============================================================================
-# MAIN ENTRY POINT
+# SINGLE RUN TIMELINE
 # =============================================================================
 
-def main():
+# State name by (is_bus_off * 2 + is_error_passive); Bus-Off wins over Error-Passive
+STATE_NAMES = ("EA", "EP", "BO", "BO")
+
+
+def build_single_run_timeline(tec_events: TecEventLog, bus_speed_kbps: int) -> list:
     """
-    Main entry point - generates all log files.
+    Turn collected TEC events into the single_run.log timeline.
     
-    Output files:
-        - attack_logs/attack_1000kbps.log
-        - attack_logs/attack_500kbps.log
-        - attack_logs/attack_250kbps.log
-        - attack_logs/single_run.log
+    Each event updates the TEC/state of the ECU it belongs to; every timeline
+    row carries the last known values of both ECUs.
+    Reference paper timing: pattern analysis ~65ms, total attack ~280ms at 500kbps
     """
-    print("=" * 60)
-    print("Bus-Off Attack Simulation")
-    print("=" * 60)
-    
-    # Set random seed for reproducibility
-    if RANDOM_SEED is not None:
-        random.seed(RANDOM_SEED)
-        print(f"Random seed: {RANDOM_SEED}")
-    
-    # Disable verbose output for bulk runs
-    ECU.verbose = False
-    CANBus.verbose = False
-    
-    start_time = time.time()
-    
-    # -------------------------------------------------------------------------
-    # Run aggregated trials for each bit rate
-    # -------------------------------------------------------------------------
-    for bus_speed in BIT_RATES_KBPS:
-        log_path = get_log_path(f"attack_{bus_speed}kbps.log")
-        print(f"\nGenerating: {log_path}")
-        print(f"  Running {NUM_TRIALS} trials at {bus_speed} kbps...")
-        
-        sweep_start = time.time()
-        results = run_aggregated_trials(bus_speed, NUM_TRIALS)
-        sweep_elapsed = time.time() - sweep_start
-        
-        write_jsonl(log_path, results)
-        print(f"  Completed in {sweep_elapsed:.1f}s")
-        print_summary(results, bus_speed)
-    
-    # -------------------------------------------------------------------------
-    # Run single detailed trial with TEC event collection
-    # -------------------------------------------------------------------------
-    single_run_path = get_log_path("single_run.log")
-    print(f"\nGenerating: {single_run_path}")
-    print(f"  Running single detailed trial at {SINGLE_RUN_SPEED_KBPS} kbps...")
-    
-    # Enable verbose for single run
-    ECU.verbose = True
-    CANBus.verbose = True
-    
-    # Enable TEC event collection to capture ALL TEC changes (including those in collision loops)
-    ECU.tec_events = []
-    
-    # Run simulation
-    result = run_single_trial(SINGLE_RUN_SPEED_KBPS, collect_timeline=False)
-    
-    # Build timeline from TEC events with proper timestamps
-    # Reference paper timing: pattern analysis ~65ms, total attack ~280ms at 500kbps
-    bit_time_ms = 1.0 / SINGLE_RUN_SPEED_KBPS  # Time per bit in ms
+    bit_time_ms = 1.0 / bus_speed_kbps  # Time per bit in ms
     frame_time_ms = BITS_PER_FRAME * bit_time_ms  # ~0.222 ms at 500 kbps
     pattern_analysis_time_ms = PATTERN_ANALYSIS_STEPS * frame_time_ms
     
@@ -465,53 +705,141 @@ def main():
     })
     
     # Process TEC events and build timeline
-    # Track current state for both ECUs
+    # Track current state for both ECUs (state codes index STATE_NAMES)
     victim_tec = 0
     attacker_tec = 0
-    victim_state = "EA"
-    attacker_state = "EA"
-    current_time_ms = pattern_analysis_time_ms
-    in_phase2 = False
-    
-    for event in ECU.tec_events:
-        # Update the appropriate ECU's state
-        if event["ecu_name"] == "Victim":
-            victim_tec = event["tec"]
-            victim_state = "BO" if event["is_bus_off"] else ("EP" if event["is_error_passive"] else "EA")
+    victim_code = 0
+    attacker_code = 0
+    
+    # Time increment per event: scaled for Phase 2 to match reference timing.
+    # Phase 2 timing starts at the first event where the victim leaves Error-Active
+    # and stays in effect even if the victim briefly returns to Error-Active.
+    victim = tec_events.ecu_code("Victim")
+    phase2_start = next((i for i, (ecu, flags) in enumerate(zip(tec_events.ecu, tec_events.flags))
+                         if ecu == victim and flags),
+                        len(tec_events))
+    phase2_increment_ms = frame_time_ms * PHASE2_TIME_SCALE
+    increments = ([frame_time_ms] * phase2_start
+                  + [phase2_increment_ms] * (len(tec_events) - phase2_start))
+    
+    # Event times: running sum of the increments after pattern analysis, produced
+    # lazily by accumulate and rounded by map as the loop consumes them (same
+    # additions in the same order, so the same values as a running total)
+    running_times_ms = itertools.accumulate(increments, initial=pattern_analysis_time_ms)
+    event_times_ms = map(round, itertools.islice(running_times_ms, 1, None), itertools.repeat(3))
+    
+    # Loop-invariant lookups bound to locals
+    append = timeline.append
+    state_names = STATE_NAMES
+    
+    for ecu, tec, flags, time_ms in zip(tec_events.ecu, tec_events.tec, tec_events.flags, event_times_ms):
+        # Update the appropriate ECU's state (flags are already a STATE_NAMES code)
+        if ecu == victim:
+            victim_tec = tec
+            victim_code = flags
         else:
-            attacker_tec = event["tec"]
-            attacker_state = "BO" if event["is_bus_off"] else ("EP" if event["is_error_passive"] else "EA")
+            attacker_tec = tec
+            attacker_code = flags
         
-        # Determine phase based on victim state
-        if victim_state in ["EP", "BO"]:
-            phase = "attack_phase2"
-            if not in_phase2:
-                in_phase2 = True
-        else:
-            phase = "attack_phase1"
-        
-        # Time increment: scaled for Phase 2 to match reference timing
-        time_increment = frame_time_ms * PHASE2_TIME_SCALE if in_phase2 else frame_time_ms
-        current_time_ms += time_increment
-        
-        timeline.append({
-            "time_ms": round(current_time_ms, 3),
+        append({
+            "time_ms": time_ms,
             "victim_tec": victim_tec,
             "attacker_tec": attacker_tec,
-            "victim_state": victim_state,
-            "attacker_state": attacker_state,
-            "phase": phase
+            "victim_state": state_names[victim_code],
+            "attacker_state": state_names[attacker_code],
+            # Phase based on victim state: anything but Error-Active is Phase 2
+            "phase": "attack_phase2" if victim_code else "attack_phase1"
         })
     
-    # Disable TEC event collection
-    ECU.tec_events = None
+    return timeline
+
+
+# =============================================================================
+# MAIN ENTRY POINT
+# =============================================================================
+
+def main():
+    """
+    Main entry point - generates all log files.
     
-    # Write timeline
-    if timeline:
-        write_jsonl(single_run_path, timeline)
-        print(f"  Detailed trial complete: {len(timeline)} TEC events logged")
-        print(f"  Bus-Off: {'Yes' if result['victim_bus_off'] else 'No'}")
-        print(f"  Total attack time: {timeline[-1]['time_ms']:.2f} ms")
+    Output files:
+        - attack_logs/attack_1000kbps.log
+        - attack_logs/attack_500kbps.log
+        - attack_logs/attack_250kbps.log
+        - attack_logs/single_run.log
+    """
+    print("=" * 60)
+    print("Bus-Off Attack Simulation")
+    print("=" * 60)
+    
+    # Set random seed for reproducibility
+    if RANDOM_SEED is not None:
+        random.seed(RANDOM_SEED)
+        print(f"Random seed: {RANDOM_SEED}")
+    
+    start_time = time.time()
+    
+    # -------------------------------------------------------------------------
+    # Run aggregated trials for each bit rate (in-process unless the sweeps are
+    # large enough to be worth one worker process per bit rate)
+    # -------------------------------------------------------------------------
+    print(f"\nRunning {NUM_TRIALS} trials at each of {BIT_RATES_KBPS} kbps...")
+    if not FULL_MODEL_SWEEPS:
+        check_fast_path()
+    
+    sweep_start = time.time()
+    if FULL_MODEL_SWEEPS:
+        # Full-model results are encoded later, on the writer thread
+        sweeps = [(run_full_model_trials(bus_speed, NUM_TRIALS), None) for bus_speed in BIT_RATES_KBPS]
+    elif NUM_TRIALS >= PARALLEL_SWEEP_MIN_TRIALS and (os.cpu_count() or 1) > 1:
+        with ProcessPoolExecutor(max_workers=len(BIT_RATES_KBPS)) as pool:
+            sweeps = list(pool.map(run_encoded_sweep, BIT_RATES_KBPS, [NUM_TRIALS] * len(BIT_RATES_KBPS)))
+    else:
+        sweeps = [run_encoded_sweep(bus_speed, NUM_TRIALS) for bus_speed in BIT_RATES_KBPS]
+    sweep_elapsed = time.time() - sweep_start
+    print(f"  Completed in {sweep_elapsed:.1f}s")
+    
+    # Log files are encoded and written on a background thread while the single
+    # run executes. It starts only after every worker pool has exited, so no
+    # process is forked while the thread is alive.
+    with BackgroundLogWriter() as writer:
+        for bus_speed, (results, lines) in zip(BIT_RATES_KBPS, sweeps):
+            if lines is None:
+                writer.submit(LOG_PATHS[bus_speed], results, encode=make_trial_encoder())
+            else:
+                writer.submit(LOG_PATHS[bus_speed], lines)
+            print(f"\nGenerating: {LOG_PATHS[bus_speed]}")
+            print_summary(results, bus_speed)
+        
+        # ---------------------------------------------------------------------
+        # Run single detailed trial with TEC event collection
+        # ---------------------------------------------------------------------
+        print(f"\nGenerating: {SINGLE_RUN_PATH}")
+        print(f"  Running single detailed trial at {SINGLE_RUN_SPEED_KBPS} kbps...")
+        
+        # Enable verbose for single run
+        ECU.verbose = True
+        CANBus.verbose = True
+        
+        # Enable TEC event collection to capture ALL TEC changes (including those in collision loops)
+        ECU.tec_events = TecEventLog()
+        
+        # Run simulation
+        result = run_single_trial(SINGLE_RUN_SPEED_KBPS, collect_timeline=False)
+        
+        # Disable TEC event collection
+        tec_events = ECU.tec_events
+        ECU.tec_events = None
+        
+        # Build and write the timeline; a run without TEC changes has nothing to log
+        if not tec_events:
+            print("  No TEC events - skipping timeline.")
+        else:
+            timeline = build_single_run_timeline(tec_events, SINGLE_RUN_SPEED_KBPS)
+            writer.submit(SINGLE_RUN_PATH, timeline, encode=compact_dumps)
+            print(f"  Detailed trial complete: {len(timeline)} TEC events logged")
+            print(f"  Bus-Off: {'Yes' if result['victim_bus_off'] else 'No'}")
+            print(f"  Total attack time: {timeline[-1]['time_ms']:.2f} ms")
     
     # -------------------------------------------------------------------------
     # Final summary
@@ -3,24 +3,40 @@ Logging utilities for Bus-Off attack simulation.
 Outputs JSON Lines format for easy parsing with pandas.read_json(lines=True).
 """
 
+import functools
 import json
 import os
+import queue
+import threading
 
 # Ensure attack_logs directory exists
 LOG_DIR = os.path.join(os.path.dirname(__file__), "attack_logs")
 os.makedirs(LOG_DIR, exist_ok=True)
 
 
+# Compact JSON encoder used for all log lines: no padding after separators and
+# no ASCII escaping pass (output is written as UTF-8)
+compact_dumps = functools.partial(json.dumps, separators=(",", ":"), ensure_ascii=False)
+
+
+# Write buffer size for log files (1 MiB), so large logs go out in few writes
+BUFFER_SIZE = 1 << 20
+
+
 class JSONLinesLogger:
-    """Simple logger that writes JSON Lines (one JSON object per line)."""
+    """
+    Simple logger that writes JSON Lines (one JSON object per line).
+    encode turns one object into one line of JSON text (default: compact_dumps).
+    """
 
-    def __init__(self, filepath: str):
+    def __init__(self, filepath: str, encode=compact_dumps):
         self.filepath = filepath
+        self.encode = encode
         self._file = None
 
     def open(self, mode: str = "w"):
         """Open log file. Use 'w' to overwrite, 'a' to append."""
-        self._file = open(self.filepath, mode, encoding="utf-8")
+        self._file = open(self.filepath, mode, encoding="utf-8", buffering=BUFFER_SIZE)
 
     def close(self):
         """Close the log file."""
@@ -31,7 +47,17 @@ class JSONLinesLogger:
     def log(self, data: dict):
         """Write a single JSON object as one line."""
         if self._file:
-            self._file.write(json.dumps(data) + "\n")
+            self._file.write(self.encode(data) + "\n")
+
+    def log_many(self, items):
+        """Write many JSON objects, one per line, with a single write call."""
+        encode = self.encode
+        self.write_lines([encode(data) for data in items])
+
+    def write_lines(self, lines):
+        """Write already-encoded JSON lines (e.g. serialized in a worker process) in one call."""
+        if self._file and lines:
+            self._file.write("\n".join(lines) + "\n")
 
     def __enter__(self):
         self.open("w")
@@ -41,6 +67,60 @@ class JSONLinesLogger:
         self.close()
 
 
+class BackgroundLogWriter:
+    """
+    Writes JSON Lines files on a background thread so the caller can keep simulating.
+    Jobs are (path, records, encode); encode=None means records are already-encoded lines.
+    Single consumer, so each file is written by exactly one thread.
+    """
+
+    _SENTINEL = object()
+
+    def __init__(self, maxsize: int = 1024):
+        self._jobs = queue.Queue(maxsize=maxsize)
+        self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+        self._error = None
+
+    def start(self):
+        """Start the writer thread."""
+        self._thread.start()
+
+    def submit(self, path: str, records, encode=None):
+        """Queue one file to be (encoded and) written by the writer thread."""
+        self._jobs.put((path, records, encode))
+
+    def close(self):
+        """Wait for all queued files to be written; re-raise any writer error."""
+        self._jobs.put(self._SENTINEL)
+        self._thread.join()
+        if self._error is not None:
+            raise self._error
+
+    def _run(self):
+        while True:
+            job = self._jobs.get()
+            if job is self._SENTINEL:
+                break
+            if self._error is not None:
+                continue
+            path, records, encode = job
+            try:
+                with JSONLinesLogger(path, encode=encode or compact_dumps) as logger:
+                    if encode is None:
+                        logger.write_lines(records)
+                    else:
+                        logger.log_many(records)
+            except Exception as exc:
+                self._error = exc
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
 def get_log_path(filename: str) -> str:
     """Return full path for a log file in attack_logs/."""
     return os.path.join(LOG_DIR, filename)
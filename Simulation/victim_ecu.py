@@ -1,20 +1,35 @@
 import random
+from can_bus import Frame
 from ecu import ECU
 
+# Bit-string lookup tables for 11-bit IDs, 4-bit DLCs and data bytes, so frames
+# are built by indexing instead of binary string formatting
+_ID_BITS = tuple(format(i, "011b") for i in range(1 << 11))
+_DLC_BITS = tuple(format(i, "04b") for i in range(1 << 4))
+_BYTE_BITS = tuple(format(i, "08b") for i in range(1 << 8))
+
+# IDs of the victim's fixed traffic pattern: the preceded frame is always
+# followed by the periodic frame, which is what the attacker learns to target
+PRECEDED_ID = _ID_BITS[0x080]
+PERIODIC_ID = _ID_BITS[0x100]
+
+# The pattern frames never change, so every VictimECU shares these instances
+PRECEDED_FRAME = Frame(id=PRECEDED_ID, dlc=_DLC_BITS[1], dlc_int=1, data=(_BYTE_BITS[0x44],))
+PERIODIC_FRAME = Frame(id=PERIODIC_ID, dlc=_DLC_BITS[1], dlc_int=1, data=(_BYTE_BITS[0x12],))
+
 class VictimECU(ECU):
-    def __init__(self, name, bus):
+    __slots__ = ("rng",)
+
+    # Frame-invariant traffic pattern, shared by every instance instead of
+    # being assigned per construction
+    preceded_frame = PRECEDED_FRAME
+    periodic_frame = PERIODIC_FRAME
+    non_periodic_id_range = (0x300, 0x3FF)
+
+    def __init__(self, name, bus, rng=None):
         super().__init__(name, bus)
-        self.preceded_frame = {
-            "id": f"{0x080:011b}",
-            "dlc": "0001",
-            "data": ["01000100"]
-        }
-        self.periodic_frame = {
-            "id": f"{0x100:011b}",
-            "dlc": "0001",
-            "data": ["00010010"]
-        }
-        self.non_periodic_id_range = (0x300, 0x3FF)
+        # Source of non-periodic frame contents: a random.Random, or the random module by default
+        self.rng = random if rng is None else rng
 
     def send_preceded_frame(self):
         """Send the preceded frame."""
@@ -26,11 +41,19 @@ class VictimECU(ECU):
 
     def send_non_periodic_frame(self):
         """Send non-periodic messages with random IDs."""
-        random_id = random.randint(*self.non_periodic_id_range)
-        random_data = [random.randint(0, 255) for _ in range(random.randint(1, 8))]
-        frame = {
-            "id": f"{random_id:011b}",
-            "dlc": f"{len(random_data):04b}",
-            "data": [f"{byte:08b}" for byte in random_data]
-        }
+        # random.random()/getrandbits are far cheaper than randint, and all data
+        # bytes come from a single getrandbits call
+        rng = self.rng
+        low, high = self.non_periodic_id_range
+        random_id = low + int(rng.random() * (high - low + 1))
+        length = 1 + int(rng.random() * 8)
+        random_data = rng.getrandbits(8 * length).to_bytes(length, "big")
+        # Positional fields (id, dlc, dlc_int, data): namedtuple keyword
+        # construction costs nearly twice as much per frame
+        frame = Frame(
+            _ID_BITS[random_id],
+            _DLC_BITS[length],
+            length,
+            tuple([_BYTE_BITS[byte] for byte in random_data]),
+        )
         self.send(frame)  # Send the non-periodic frame